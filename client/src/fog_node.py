@@ -1,24 +1,36 @@
 import os
+import argparse
+from dataclasses import dataclass, fields
+import numpy as np
 import pandas as pd
 import joblib
 import paho.mqtt.client as mqtt
 import json
+import orjson
 import time
+import queue
+import threading
 import smtplib
 from dotenv import load_dotenv
 from email.mime.text import MIMEText
 
 # ---------- CONFIGURATION ----------
-NODE_ID = "Fog_Node_1"
-MODEL_PATH = "models/best_model_random_forest.pkl"
-SCALER_PATH = "models/scaler.pkl"
-DATA_PATH = "data/simulation_node_1.csv"
-
-MQTT_BROKER = "192.168.1.159"
-MQTT_PORT = 1883
+# Chaque nœud publie sur "<topic>/<node_id>" : le serveur identifie le nœud sans lire le message
 TOPIC_RESULTS = "fog/transactions/results"
 TOPIC_RAW = "fog/transactions/raw"
 
+# Nombre de lignes brutes envoyées par message MQTT
+RAW_BATCH_SIZE = 10
+
+# Ordre des valeurs dans les lignes brutes publiées ({"Rows": [[...], ...]})
+RAW_COLUMNS = ["Time"] + [f"V{i}" for i in range(1, 29)] + ["Amount"]
+
+# Nombre de lignes du CSV lues, normalisées et prédites à la fois
+CSV_CHUNK_ROWS = 4096
+
+# Attente maximale (s) de l'envoi des derniers messages MQTT avant de quitter
+PUBLISH_TIMEOUT = 10
+
 # Charger le fichier .env
 load_dotenv()
 
@@ -29,90 +41,282 @@ SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD")
 RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL")
 
+# Regroupement des alertes : fenêtre (secondes) et nombre maximal par email
+EMAIL_BATCH_WINDOW = 1.0
+EMAIL_BATCH_MAX = 10
+
+
+@dataclass
+class FogNodeConfig:
+    """Paramètres propres à chaque fog node.
+
+    Chaque champ peut être passé en ligne de commande (--node-id, --mqtt-broker, ...)
+    ou par variable d'environnement (NODE_ID, MQTT_BROKER, ...), sinon la valeur par défaut.
+    """
+    node_id: str = "Fog_Node_1"
+    data_path: str = "data/simulation_node_1.csv"
+    model_path: str = "models/best_model_random_forest.pkl"
+    # Version ONNX du modèle (server/src/export_onnx.py), utilisée si onnxruntime est installé
+    onnx_model_path: str = "models/best_model_random_forest.onnx"
+    scaler_path: str = "models/scaler.pkl"
+    mqtt_broker: str = "192.168.1.159"
+    mqtt_port: int = 1883
+
+    @classmethod
+    def from_args(cls, argv=None):
+        """Construit la configuration depuis la ligne de commande et l'environnement."""
+        parser = argparse.ArgumentParser(description="Fog node : détection de fraude et publication MQTT")
+        for field in fields(cls):
+            parser.add_argument(
+                "--" + field.name.replace("_", "-"),
+                type=type(field.default),
+                default=os.getenv(field.name.upper(), field.default),
+            )
+        return cls(**vars(parser.parse_args(argv)))
+
 
 # ---------- FONCTION ENVOI EMAIL ----------
-def send_email(subject, message):
-    """Envoie un email via SMTP."""
+def smtp_connect():
+    """Ouvre une connexion SMTP authentifiée (STARTTLS)."""
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    server.starttls()
+    server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+
+def send_email(subject, message, server=None):
+    """Envoie un email via SMTP (sur la connexion `server` si elle est fournie)."""
     try:
         msg = MIMEText(message)
         msg["Subject"] = subject
         msg["From"] = SENDER_EMAIL
         msg["To"] = RECEIVER_EMAIL
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
-        server.quit()
+        if server is None:
+            with smtp_connect() as own_server:
+                own_server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
+        else:
+            server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
 
         print("📧 Email sent successfully!")
 
+    except smtplib.SMTPServerDisconnected:
+        # Connexion persistante fermée par le serveur : l'appelant se reconnecte
+        if server is not None:
+            raise
+        print("❌ Failed to send email: server disconnected")
     except Exception as e:
         print("❌ Failed to send email:", e)
 
 
+# ---------- FILE D'ENVOI EMAIL ----------
+# Les alertes sont envoyées par un thread dédié pour ne pas bloquer la boucle de publication
+mail_queue = queue.Queue()
+# Placé dans la file en fin de programme : le thread ferme la connexion SMTP et s'arrête
+MAIL_STOP = None
+
+
+def mail_worker(node_id):
+    """Envoie les alertes de la file sur une connexion SMTP persistante.
+
+    Les alertes arrivées dans la même fenêtre de EMAIL_BATCH_WINDOW secondes
+    sont regroupées en un seul email (au plus EMAIL_BATCH_MAX).
+    """
+    server = None
+    stop = False
+    while not stop:
+        alert = mail_queue.get()
+        if alert is MAIL_STOP:
+            mail_queue.task_done()
+            break
+        alerts = [alert]
+        deadline = time.monotonic() + EMAIL_BATCH_WINDOW
+        while len(alerts) < EMAIL_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                alert = mail_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if alert is MAIL_STOP:
+                # Envoyer le lot en cours, puis s'arrêter
+                mail_queue.task_done()
+                stop = True
+                break
+            alerts.append(alert)
+
+        if len(alerts) == 1:
+            subject, body = alerts[0]
+        else:
+            subject = f"🚨 {len(alerts)} FRAUD ALERTS from {node_id}"
+            body = "\n\n".join(alert_body for _, alert_body in alerts)
+
+        # Une reconnexion au plus si le serveur a fermé la connexion inactive
+        for _ in range(2):
+            try:
+                if server is None:
+                    server = smtp_connect()
+                send_email(subject, body, server)
+                break
+            except smtplib.SMTPServerDisconnected:
+                server = None
+            except Exception as e:
+                print("❌ Failed to connect to SMTP server:", e)
+                server = None
+                break
+        else:
+            # Connexion refermée aussi après la reconnexion : les alertes du lot sont perdues
+            print(f"❌ Failed to send {len(alerts)} email alert(s): SMTP server disconnected")
+
+        for _ in alerts:
+            mail_queue.task_done()
+
+    # Fermeture propre de la connexion persistante (QUIT)
+    if server is not None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
 # ---------- FONCTIONS MQTT ----------
-def load_model(path):
-    return joblib.load(path)
+class OnnxModel:
+    """Modèle exécuté par ONNX Runtime, avec la même méthode predict que sklearn."""
+
+    def __init__(self, path):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count()
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, X):
+        # Première sortie du modèle converti : la classe prédite
+        return self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[0]
+
+
+def load_model(path, onnx_path=None):
+    # ONNX Runtime si le modèle exporté est présent, sinon le pickle sklearn
+    if onnx_path and os.path.exists(onnx_path):
+        try:
+            return OnnxModel(onnx_path)
+        except ImportError:
+            print("⚠️ onnxruntime not installed, using the sklearn model")
 
-def connect_mqtt(broker, port):
-    client = mqtt.Client(NODE_ID)
+    model = joblib.load(path)
+    # Les arbres de la forêt sont évalués en parallèle sur tous les cœurs
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = -1
+    return model
+
+def connect_mqtt(broker, port, client_id):
+    client = mqtt.Client(client_id)
+    # File d'envoi sans limite : publish() n'attend jamais le réseau
+    client.max_inflight_messages_set(65535)
+    client.max_queued_messages_set(0)
     client.connect(broker, port)
+    # Thread réseau dédié : les envois se font en arrière-plan
+    client.loop_start()
     return client
 
 def publish(client, topic, message):
-    client.publish(topic, json.dumps(message))
+    # orjson produit directement des bytes (et accepte les scalaires NumPy)
+    return client.publish(topic, orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY), qos=0)
 
 
 # ---------- MAIN ----------
-def main():
-    model = load_model(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    df = pd.read_csv(DATA_PATH)
-
-    mqtt_client = connect_mqtt(MQTT_BROKER, MQTT_PORT)
-
-    X = df.drop(columns=["Class"])
-    X_scaled = scaler.transform(X)
-    predictions = model.predict(X_scaled)
-
-    for idx, row in df.iterrows():
-
-        # ----- Envoi des données brutes -----
-        data_row = row.drop("Class").to_dict()
-        data_row["Node_ID"] = NODE_ID
-        publish(mqtt_client, TOPIC_RAW, data_row)
-
-        # ----- Prediction -----
-        prediction = int(predictions[idx])
-        result_message = {
-            "Node_ID": NODE_ID,
-            "Time": int(row["Time"]),
-            "Prediction": prediction
-        }
-        publish(mqtt_client, TOPIC_RESULTS, result_message)
-
-        print(f"[{NODE_ID}] Sent row {idx+1} - Prediction = {prediction}")
-
-        # ----- Envoi EMAIL si fraude détectée -----
-        if prediction == 1:
-            email_subject = f"🚨 FRAUD ALERT from {NODE_ID}"
-            email_body = f"""
+def main(config=None):
+    if config is None:
+        config = FogNodeConfig.from_args()
+    node_id = config.node_id
+
+    model = load_model(config.model_path, config.onnx_model_path)
+    scaler = joblib.load(config.scaler_path)
+
+    mqtt_client = connect_mqtt(config.mqtt_broker, config.mqtt_port, node_id)
+    topic_raw = f"{TOPIC_RAW}/{node_id}"
+    topic_results = f"{TOPIC_RESULTS}/{node_id}"
+    mail_thread = threading.Thread(target=mail_worker, args=(node_id,), daemon=True)
+    mail_thread.start()
+
+    raw_batch = []
+    last_message = None
+    idx = 0
+
+    # Lecture du CSV par blocs : seul un bloc est en mémoire à la fois
+    for df in pd.read_csv(config.data_path, chunksize=CSV_CHUNK_ROWS):
+        X = df.drop(columns=["Class"])
+        # float32 : le type interne des arbres sklearn, évite une copie dans predict
+        X_scaled = scaler.transform(X.astype(np.float32))
+        predictions = model.predict(X_scaled)
+
+        # Conversion unique en listes Python (évite un Series pandas par ligne)
+        rows = df[RAW_COLUMNS].to_numpy().tolist()
+        times = df["Time"].to_numpy(np.int64)
+
+        for i, values in enumerate(rows):
+
+            # ----- Envoi des données brutes (par lots, valeurs sans noms de colonnes) -----
+            raw_batch.append(values)
+            if len(raw_batch) >= RAW_BATCH_SIZE:
+                publish(mqtt_client, topic_raw, {"Rows": raw_batch})
+                raw_batch = []
+
+            # ----- Prediction -----
+            prediction = int(predictions[i])
+            result_message = {
+                "Time": int(times[i]),
+                "Prediction": prediction
+            }
+            last_message = publish(mqtt_client, topic_results, result_message)
+
+            print(f"[{node_id}] Sent row {idx+1} - Prediction = {prediction}")
+
+            # ----- Envoi EMAIL si fraude détectée -----
+            if prediction == 1:
+                # Le dict descriptif n'est construit que pour l'email
+                data_row = dict(zip(RAW_COLUMNS, values))
+                data_row["Node_ID"] = node_id
+                email_subject = f"🚨 FRAUD ALERT from {node_id}"
+                email_body = f"""
 Une transaction frauduleuse a été détectée !
 
-Node ID : {NODE_ID}
-Time : {int(row['Time'])}
+Node ID : {node_id}
+Time : {times[i]}
 Transaction index : {idx}
 
 Données de la transaction :
 {json.dumps(data_row, indent=4)}
 """
-            send_email(email_subject, email_body)
+                mail_queue.put((email_subject, email_body))
+
+            # Pause entre les lignes
+            time.sleep(1)
+            idx += 1
+
+    # Envoi des dernières lignes du lot
+    if raw_batch:
+        last_message = publish(mqtt_client, topic_raw, {"Rows": raw_batch})
+
+    # Les messages partent dans l'ordre : attendre le dernier suffit.
+    # Délai borné : les messages QoS 0 en attente sont perdus si la connexion tombe
+    if last_message is not None:
+        try:
+            last_message.wait_for_publish(timeout=PUBLISH_TIMEOUT)
+            # Délai dépassé : wait_for_publish rend la main sans erreur
+            if not last_message.is_published():
+                print(f"[{node_id}] Last messages not sent: timed out after {PUBLISH_TIMEOUT}s")
+        except (RuntimeError, ValueError) as e:
+            print(f"[{node_id}] Last messages not sent: {e}")
 
-        # Pause entre les lignes
-        time.sleep(1)
+    # Attendre l'envoi des dernières alertes avant de quitter, puis fermer la connexion SMTP
+    mail_queue.join()
+    mail_queue.put(MAIL_STOP)
+    mail_thread.join()
 
     mqtt_client.disconnect()
+    mqtt_client.loop_stop()
     print("All data processed.")
 
 
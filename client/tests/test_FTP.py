@@ -1,54 +1,84 @@
-from ftplib import FTP, error_perm
+from ftplib import FTP
+from concurrent.futures import ThreadPoolExecutor
 import os
+import socket
+import threading
 
 # ---------- CONFIGURATION ----------
 FTP_HOST = "192.168.1.158"
 FTP_USER = "fognode1"
 FTP_PASS = "root"
 LOCAL_ROOT = "."  # Local folder to save files
+MAX_WORKERS = 4  # Parallel downloads, each on its own FTP connection
+BLOCK_SIZE = 1 << 18  # 256 KiB read per retrbinary callback (default 8 KiB)
+FILE_BUFFER = 1 << 20  # 1 MiB local write buffer
+SOCKET_BUFFER = 1 << 20  # 1 MiB receive buffer on the data connections
 
-# ---------- FUNCTION ----------
-def download_ftp_tree(ftp: FTP, remote_dir: str, local_dir: str, indent: str = ""):
-    """
-    Recursively downloads files from FTP server while preserving folder structure.
-    """
-    try:
-        ftp.cwd(remote_dir)
-    except error_perm:
-        # It's a file
-        local_file_path = os.path.join(local_dir, remote_dir)
-        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-        with open(local_file_path, 'wb') as f:
-            ftp.retrbinary(f"RETR {remote_dir}", f.write)
-        print(f"[DOWNLOADING] {remote_dir}")
-        return
+# FTP sessions are not thread-safe: every worker thread opens and keeps its own
+_worker = threading.local()
+_worker_connections = []
+_worker_connections_lock = threading.Lock()
 
-    # It's a folder
-    print(f"[FOLDER] {remote_dir}/")
-    os.makedirs(os.path.join(local_dir, remote_dir), exist_ok=True)
+# ---------- FUNCTIONS ----------
+class BufferedFTP(FTP):
+    """FTP client that enlarges the receive buffer of each data connection."""
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = super().ntransfercmd(cmd, rest)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+        return conn, size
 
-    file_list = []
-    ftp.retrlines("NLST", file_list.append)
+def connect() -> FTP:
+    ftp = BufferedFTP(FTP_HOST)
+    ftp.login(FTP_USER, FTP_PASS)
+    return ftp
 
-    for item in file_list:
-        download_ftp_tree(ftp, item, os.path.join(local_dir, remote_dir), indent + "    ")
+def list_ftp_tree(ftp: FTP, remote_dir: str, local_dir: str):
+    """
+    Recursively lists the files on the FTP server and creates the local folder structure.
+    MLSD returns each entry's type, so no CWD is needed to tell files from folders.
+    Returns (remote_path, local_path) pairs.
+    """
+    files = []
+    for name, facts in ftp.mlsd(remote_dir, facts=["type"]):
+        remote_path = f"{remote_dir}/{name}" if remote_dir else name
+        local_path = os.path.join(local_dir, name)
+        if facts["type"] == "dir":
+            print(f"[FOLDER] {remote_path}/")
+            os.makedirs(local_path, exist_ok=True)
+            files.extend(list_ftp_tree(ftp, remote_path, local_path))
+        elif facts["type"] == "file":
+            files.append((remote_path, local_path))
+    return files
 
-    ftp.cwd("..")
+def download_file(remote_path: str, local_path: str):
+    """Downloads one file on the calling thread's own FTP connection."""
+    ftp = getattr(_worker, "ftp", None)
+    if ftp is None:
+        ftp = _worker.ftp = connect()
+        with _worker_connections_lock:
+            _worker_connections.append(ftp)
+    # retrbinary switches to TYPE I; large blocks mean far fewer recv() calls and callbacks
+    with open(local_path, 'wb', buffering=FILE_BUFFER) as f:
+        ftp.retrbinary(f"RETR {remote_path}", f.write, blocksize=BLOCK_SIZE)
+    print(f"[DOWNLOADING] {remote_path}")
 
 # ---------- MAIN SCRIPT ----------
 def main():
-    ftp = FTP(FTP_HOST)
-    ftp.login(FTP_USER, FTP_PASS)
+    ftp = connect()
     print(f"Connected to FTP server: {FTP_HOST}\n")
 
-    # List root folders/files
-    root_items = []
-    ftp.retrlines("NLST", root_items.append)
+    # List the whole tree on one connection, then download the files in parallel
+    files = list_ftp_tree(ftp, "", LOCAL_ROOT)
+    ftp.quit()
 
-    for item in root_items:
-        download_ftp_tree(ftp, item, LOCAL_ROOT)
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # list() waits for every download and re-raises the first failure
+            list(executor.map(lambda item: download_file(*item), files))
+    finally:
+        for worker_ftp in _worker_connections:
+            worker_ftp.quit()
 
-    ftp.quit()
     print("\nAll files downloaded successfully.")
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import paho.mqtt.client as mqtt
-import json
+import orjson
 import time
 import random
 
@@ -9,6 +9,9 @@ TOPIC = "fraud_alerts"
 
 NODE_NAME = "Fog_Node_1"
 
+# Début constant du message d'alerte, sérialisé une seule fois
+ALERT_PREFIX = b'{"node":' + orjson.dumps(NODE_NAME) + b',"transaction":'
+
 # Création client MQTT
 client = mqtt.Client(NODE_NAME)
 client.connect(BROKER, PORT)
@@ -25,11 +28,19 @@ def generate_transaction():
 
 # Envoi d'alerte
 def send_alert(transaction):
-    alert = {
-        "node": NODE_NAME,
-        "transaction": transaction
-    }
-    client.publish(TOPIC, json.dumps(alert))
+    # {"node": NODE_NAME, "transaction": transaction} : seule la transaction est sérialisée
+    info = client.publish(TOPIC, ALERT_PREFIX + orjson.dumps(transaction) + b"}")
+    # Attendre que paho ait envoyé le message : la file de sortie ne grossit jamais.
+    # Broker injoignable : l'alerte est perdue, loop_start() se charge de la reconnexion
+    try:
+        info.wait_for_publish(timeout=1.0)
+    except (RuntimeError, ValueError) as e:
+        print(f"[{NODE_NAME}] Alert not sent ({e}): {transaction}")
+        return
+    # Délai dépassé : wait_for_publish rend la main sans erreur
+    if not info.is_published():
+        print(f"[{NODE_NAME}] Alert not sent (timeout): {transaction}")
+        return
     print(f"[{NODE_NAME}] Alert sent: {transaction}")
 
 # Simulation d'envoi d'alertes toutes les 5 secondes
@@ -3,14 +3,15 @@ Streamlit Dashboard for Fog Node Monitoring System.
 Displays real-time status of fog nodes, transaction data, and fraud detection results.
 """
 
+import os
+import time
 import streamlit as st
 import pandas as pd
+import numpy as np
 import yaml
-from datetime import datetime, timedelta
-import time
+from datetime import datetime
+from dateutil import tz
 from database import DatabaseHandler
-import plotly.express as px
-import plotly.graph_objects as go
 
 
 # Page configuration
@@ -22,30 +23,87 @@ st.set_page_config(
 )
 
 
-@st.cache_resource
+CONFIG_PATH = "config.yaml"
+
+# Local timezone used to display epoch timestamps (with its DST rules, like datetime.fromtimestamp)
+LOCAL_TZ = tz.tzlocal()
+
+
+@st.cache_resource(show_spinner=False)
+def _parse_config(mtime):
+    """Parse the YAML configuration file (cached per file modification time)."""
+    # libyaml's C loader when PyYAML was built with it, else the pure-Python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(CONFIG_PATH, 'rb') as f:
+        return yaml.load(f, Loader=loader)
+
+
 def load_config():
-    """Load configuration from YAML file."""
-    with open("config.yaml", 'r') as f:
-        return yaml.safe_load(f)
+    """Load configuration from YAML file, re-parsing it only when it changes on disk."""
+    return _parse_config(os.stat(CONFIG_PATH).st_mtime)
+
+
+# Bound once per script run so hot paths read it without a cache lookup
+_CONFIG = load_config()
+
+
+# Status indicator emoji
+STATUS_EMOJI = {
+    'online': '🟢',
+    'warning': '🟠',
+    'offline': '🔴',
+    'unknown': '⚪'
+}
+
+# Status card for a single fog node; all cards are emitted together in CARD_GRID_TEMPLATE
+CARD_TEMPLATE = """<div style="border: 2px solid {color}; border-radius: 10px; padding: 15px; background-color: rgba(0,0,0,0.05);">
+<h3>{emoji} {name}</h3>
+<p><strong>ID:</strong> {id}</p>
+<p><strong>Location:</strong> {location}</p>
+<p><strong>Status:</strong> {status}</p>
+<p><strong>Last Seen:</strong> {last_seen}</p>
+<p><strong>Transactions:</strong> {total_tx}</p>
+<p><strong>Fraud Rate:</strong> {fraud_rate:.1f}%</p>
+</div>"""
+
+CARD_GRID_TEMPLATE = """<div style="display: grid; grid-template-columns: repeat({columns}, 1fr); gap: 10px; margin: 10px 0;">
+{cards}
+</div>"""
+
+# Rows shown in the recent transactions / fraud results tables
+TABLE_ROWS = 20
 
 
 @st.cache_resource
 def get_db():
     """Get database handler instance."""
-    config = load_config()
-    return DatabaseHandler(config['database']['path'])
+    return DatabaseHandler(_CONFIG['database']['path'])
+
+
+@st.cache_data(ttl=1, show_spinner=False, persist=False)
+def get_change_token(node_id=None):
+    """Get the newest stored row IDs (shared by all sections refreshed in the same tick)."""
+    return get_db().get_change_token(node_id)
+
+
+@st.cache_data(ttl=_CONFIG['dashboard']['refresh_interval'], show_spinner=False, persist=False)
+def query_db(method, token, **kwargs):
+    """Run a read-only DatabaseHandler query, cached until new data arrives.
+    
+    The change token is part of the cache key, so refreshes with no new rows
+    reuse the previous result instead of querying SQLite again.
+    """
+    return getattr(get_db(), method)(**kwargs)
 
 
 def get_node_status_color(node):
     """Determine status color based on last seen time."""
-    config = load_config()
-    offline_threshold = config['dashboard']['node_offline_threshold']
+    offline_threshold = _CONFIG['dashboard']['node_offline_threshold']
     
-    if not node['last_seen']:
+    if node['last_seen_epoch'] is None:
         return 'gray', 'unknown'
     
-    last_seen = datetime.fromisoformat(node['last_seen'])
-    time_diff = (datetime.now() - last_seen).total_seconds()
+    time_diff = time.time() - node['last_seen_epoch']
     
     if time_diff < offline_threshold:
         return 'green', 'online'
@@ -55,57 +113,269 @@ def get_node_status_color(node):
         return 'red', 'offline'
 
 
-def format_timestamp(timestamp_str):
-    """Format timestamp for display."""
-    if not timestamp_str:
+def format_timestamp(epoch):
+    """Format an epoch timestamp for display."""
+    if epoch is None:
         return "Never"
     
-    try:
-        dt = datetime.fromisoformat(timestamp_str)
-        time_diff = datetime.now() - dt
+    time_diff = time.time() - epoch
+    
+    if time_diff < 60:
+        return f"{int(time_diff)}s ago"
+    elif time_diff < 3600:
+        return f"{int(time_diff / 60)}m ago"
+    elif time_diff < 86400:
+        return f"{int(time_diff / 3600)}h ago"
+    else:
+        return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def epochs_to_datetimes(epochs: np.ndarray) -> pd.DatetimeIndex:
+    """Convert epoch timestamps to naive local-time datetimes."""
+    return pd.to_datetime(epochs, unit='s', utc=True).tz_convert(LOCAL_TZ).tz_localize(None)
+
+
+def format_timestamps_series(epochs: pd.Series) -> np.ndarray:
+    """Vectorized version of format_timestamp for a whole column of epoch timestamps."""
+    values = epochs.to_numpy(dtype=float)
+    missing = np.isnan(values)
+    values = np.where(missing, 0.0, values)
+    delta = time.time() - values
+    
+    return np.select(
+        [missing, delta < 60, delta < 3600, delta < 86400],
+        [
+            "Never",
+            np.char.mod('%ds ago', np.trunc(delta)),
+            np.char.mod('%dm ago', np.trunc(delta / 60)),
+            np.char.mod('%dh ago', np.trunc(delta / 3600))
+        ],
+        default=epochs_to_datetimes(values).strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+
+def format_number_column(values: pd.Series, fmt: str) -> np.ndarray:
+    """Format a numeric column with a printf-style pattern, using 'N/A' for missing values."""
+    numbers = values.to_numpy(dtype=float)
+    return np.where(np.isnan(numbers), 'N/A', np.char.mod(fmt, numbers))
+
+
+def render_overall_stats():
+    """Render the overall statistics metrics."""
+    token = get_change_token()
+    total_tx = query_db('get_transaction_count', token)
+    fraud_stats = query_db('get_fraud_stats', token)
+    
+    st.metric("Total Transactions", total_tx)
+    st.metric("Total Fraud Checks", fraud_stats['total'])
+    st.metric("Fraud Rate", f"{fraud_stats['fraud_rate']:.1f}%")
+
+
+def render_node_status():
+    """Render the status cards of all fog nodes."""
+    token = get_change_token()
+    nodes = query_db('get_all_nodes', token)
+    
+    # Fetch stats for every node at once instead of querying per card
+    tx_by_node = query_db('get_transaction_counts_by_node', token)
+    fraud_by_node = query_db('get_fraud_stats_by_node', token)
+    
+    if not nodes:
+        st.warning("No fog nodes configured. Please check your config.yaml file.")
+    else:
+        # Build every card first and send them to the browser as one element
+        cards = []
+        for node in nodes:
+            color, status = get_node_status_color(node)
+            cards.append(CARD_TEMPLATE.format(
+                color=color,
+                emoji=STATUS_EMOJI[status],
+                name=node['name'],
+                id=node['id'],
+                location=node['location'] or 'N/A',
+                status=status.upper(),
+                last_seen=format_timestamp(node['last_seen_epoch']),
+                total_tx=tx_by_node.get(node['id'], 0),
+                fraud_rate=fraud_by_node.get(node['id'], {'fraud_rate': 0})['fraud_rate']
+            ))
+
+        st.markdown(
+            CARD_GRID_TEMPLATE.format(columns=min(3, len(nodes)), cards="".join(cards)),
+            unsafe_allow_html=True
+        )
+
+
+def render_transaction_table(filter_node_id, max_display):
+    """Render the table of the most recent transactions."""
+    token = get_change_token(filter_node_id)
+    tx_df = query_db('get_recent_transactions_df', token, limit=min(max_display, TABLE_ROWS), node_id=filter_node_id)
+    
+    if tx_df.empty:
+        st.info("No transactions recorded yet. Waiting for data from fog nodes...")
+        return
+    
+    # Format timestamp
+    if 'epoch' in tx_df.columns:
+        tx_df['time_ago'] = format_timestamps_series(tx_df['epoch'])
+    
+    # Create clean display dataframe with key transaction data (Class removed)
+    display_df = pd.DataFrame({
+        'ID': tx_df['id'].to_numpy(),
+        'Node': tx_df['node_name'].to_numpy(),
+        'Time': format_number_column(tx_df['time'], '%.0f'),
+        'Amount': format_number_column(tx_df['amount'], '$%.2f'),
+        'Recorded': tx_df['time_ago'].to_numpy()
+    })
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+
+def render_volume_chart(filter_node_id):
+    """Render the transaction volume chart (full history, aggregated in SQL)."""
+    token = get_change_token(filter_node_id)
+    first_ts, last_ts = query_db('get_transaction_time_range', token, node_id=filter_node_id)
+    if first_ts is None:
+        return
+    
+    st.subheader("Transaction Volume Over Time")
+
+    # Determine the time range of data
+    total_minutes = (last_ts - first_ts) / 60
+
+    # Smart bucketing based on time range
+    if total_minutes <= 60:           # Less than 1 hour → 1-minute buckets
+        bucket_minutes = 1
+        label = 'per Minute'
+    elif total_minutes <= 6*60:       # Less than 6 hours → 5-minute buckets
+        bucket_minutes = 5
+        label = 'per 5 Minutes'
+    elif total_minutes <= 24*60:      # Less than 1 day → 10-minute buckets
+        bucket_minutes = 10
+        label = 'per 10 Minutes'
+    elif total_minutes <= 7*24*60:    # Less than 1 week → 30-minute buckets
+        bucket_minutes = 30
+        label = 'per 30 Minutes'
+    else:
+        bucket_minutes = 60           # More than a week → hourly
+        label = 'per Hour'
+
+    # Count transactions per time bucket in the database
+    volume_data = pd.DataFrame(
+        query_db('get_transaction_volume', token, bucket_seconds=bucket_minutes * 60, node_id=filter_node_id)
+    )
+    volume_data['time_bucket'] = epochs_to_datetimes(volume_data['time_bucket'].to_numpy())
+
+    # Plotly is only imported once a chart is actually drawn
+    import plotly.express as px
+
+    # Nice title
+    title = f"Transaction Volume {label}"
+
+    fig = px.line(
+        volume_data,
+        x='time_bucket',
+        y='count',
+        title=title,
+        labels={'time_bucket': 'Time', 'count': 'Transactions'},
+        markers=True
+    )
+
+    # Improve readability
+    fig.update_layout(hovermode="x unified")
+    fig.update_traces(line=dict(width=2), marker=dict(size=6))
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def render_amount_hist(filter_node_id):
+    """Render the transaction amount distribution (full history)."""
+    token = get_change_token(filter_node_id)
+    # Amounts are binned in SQLite, so only the 20 bin counts are loaded (and sent to the browser)
+    hist_df = pd.DataFrame(query_db('get_amount_histogram', token, bins=20, node_id=filter_node_id))
+    
+    if not hist_df.empty and hist_df['count'].sum() > 5:
+        st.subheader("Transaction Amount Distribution")
+
+        import plotly.express as px
         
-        if time_diff < timedelta(seconds=60):
-            return f"{int(time_diff.total_seconds())}s ago"
-        elif time_diff < timedelta(hours=1):
-            return f"{int(time_diff.total_seconds() / 60)}m ago"
-        elif time_diff < timedelta(days=1):
-            return f"{int(time_diff.total_seconds() / 3600)}h ago"
-        else:
-            return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except:
-        return timestamp_str
+        fig = px.bar(
+            hist_df,
+            x='amount',
+            y='count',
+            title='Distribution of Transaction Amounts',
+            labels={'amount': 'Amount ($)', 'count': 'Frequency'}
+        )
+        fig.update_layout(bargap=0)
+        st.plotly_chart(fig, use_container_width=True)
 
 
-def render_node_card(node, stats):
-    """Render a single fog node status card."""
-    color, status = get_node_status_color(node)
+def render_fraud_table(filter_node_id, max_display):
+    """Render the table of the most recent fraud detection results."""
+    token = get_change_token(filter_node_id)
+    fraud_df = query_db('get_recent_fraud_results_df', token, limit=min(max_display, TABLE_ROWS), node_id=filter_node_id)
     
-    # Status indicator emoji
-    status_emoji = {
-        'online': '🟢',
-        'warning': '🟠',
-        'offline': '🔴',
-        'unknown': '⚪'
-    }
+    if fraud_df.empty:
+        st.info("No fraud detection results yet. Waiting for data from fog nodes...")
+        return
+
+    # Format timestamp
+    if 'epoch' in fraud_df.columns:
+        fraud_df['time_ago'] = format_timestamps_series(fraud_df['epoch'])
+
+    # Add status emoji based on prediction (0 = legitimate, 1 = fraud)
+    fraud_df['is_fraud'] = fraud_df['prediction'] == 1
+    fraud_df['status'] = np.where(fraud_df['is_fraud'], '🔴 FRAUD', '🟢 LEGITIMATE')
+
+    # Prepare display data
+    display_df = pd.DataFrame({
+        'ID': fraud_df['id'].to_numpy(),
+        'Node': fraud_df['node_name'].to_numpy(),
+        'Status': fraud_df['status'].to_numpy(),
+        'Time': format_number_column(fraud_df['time'], '%.0f'),
+        'Recorded': fraud_df['time_ago'].to_numpy()
+    })
+
+    # Color code rows (one precomputed color per row, applied to every column)
+    row_colors = np.where(
+        fraud_df['is_fraud'].to_numpy(),
+        'background-color: rgba(255, 0, 0, 0.1)',
+        'background-color: rgba(0, 255, 0, 0.05)'
+    )
+    styled_df = display_df.style.apply(lambda col: row_colors, axis=0)
+    st.dataframe(styled_df, use_container_width=True, hide_index=True)
+
+
+def render_fraud_bar(filter_node_id):
+    """Render the fraud rate by node chart (full history, from the grouped node stats)."""
+    token = get_change_token()
+    nodes = query_db('get_all_nodes', token)
+    fraud_by_node = query_db('get_fraud_stats_by_node', token)
     
-    with st.container():
-        st.markdown(f"""
-        <div style="
-            border: 2px solid {color};
-            border-radius: 10px;
-            padding: 15px;
-            margin: 10px 0;
-            background-color: rgba(0,0,0,0.05);
-        ">
-            <h3>{status_emoji[status]} {node['name']}</h3>
-            <p><strong>ID:</strong> {node['id']}</p>
-            <p><strong>Location:</strong> {node['location'] or 'N/A'}</p>
-            <p><strong>Status:</strong> {status.upper()}</p>
-            <p><strong>Last Seen:</strong> {format_timestamp(node['last_seen'])}</p>
-            <p><strong>Transactions:</strong> {stats['total_tx']}</p>
-            <p><strong>Fraud Rate:</strong> {stats['fraud_rate']:.1f}%</p>
-        </div>
-        """, unsafe_allow_html=True)
+    fraud_rate_df = pd.DataFrame([
+        {'node_name': node['name'], **fraud_by_node[node['id']]}
+        for node in nodes
+        if node['id'] in fraud_by_node and filter_node_id in (None, node['id'])
+    ])
+
+    if not fraud_rate_df.empty:
+        st.subheader("Fraud Rate by Node (Percent of fraud transaction from Total)")
+
+        import plotly.express as px
+        
+        fig = px.bar(
+            fraud_rate_df,
+            x='node_name',
+            y='fraud_rate',
+            title='Fraud Rate by Fog Node (%)',
+            labels={'node_name': 'Node', 'fraud_rate': 'Fraud Rate (%)'},
+            color='fraud_rate',
+            color_continuous_scale='Reds'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def render_footer():
+    """Render the last update time."""
+    st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 
 def main():
@@ -115,9 +385,9 @@ def main():
     st.title("🌐 Fog Node Monitoring Dashboard")
     st.markdown("---")
     
-    # Get database connection
-    db = get_db()
-    config = load_config()
+    config = _CONFIG
+    nodes = query_db('get_all_nodes', get_change_token())
+    max_display = config['dashboard']['max_transactions_display']
     
     # Sidebar
     with st.sidebar:
@@ -132,12 +402,14 @@ def main():
             value=config['dashboard']['refresh_interval']
         )
         
+        # Charts read the full history, so they are only queried when shown
+        show_charts = st.toggle("📈 Show analytics charts", value=False)
+        
         st.markdown("---")
         
         # Node filter
         st.header("🔍 Filters")
-        all_nodes = db.get_all_nodes()
-        node_options = ["All Nodes"] + [f"Node {n['id']}: {n['name']}" for n in all_nodes]
+        node_options = ["All Nodes"] + [f"Node {n['id']}: {n['name']}" for n in nodes]
         selected_node = st.selectbox("Select Node", node_options)
         
         if selected_node == "All Nodes":
@@ -149,221 +421,37 @@ def main():
         
         # Stats
         st.header("📊 Overall Statistics")
-        total_tx = db.get_transaction_count()
-        fraud_stats = db.get_fraud_stats()
         
-        st.metric("Total Transactions", total_tx)
-        st.metric("Total Fraud Checks", fraud_stats['total'])
-        st.metric("Fraud Rate", f"{fraud_stats['fraud_rate']:.1f}%")
+        # Sections are fragments: refresh ticks rerun them without rerunning the whole script
+        run_every = refresh_interval if auto_refresh else None
+        st.fragment(render_overall_stats, run_every=run_every)()
     
     # Main content
     
     # Fog Nodes Status Section
     st.header("🖥️ Fog Nodes Status")
-    
-    nodes = db.get_all_nodes()
-    
-    if not nodes:
-        st.warning("No fog nodes configured. Please check your config.yaml file.")
-    else:
-        # Create columns for node cards
-        cols = st.columns(min(3, len(nodes)))
-        
-        for idx, node in enumerate(nodes):
-            # Get stats for this node
-            tx_count = db.get_transaction_count(node['id'])
-            fraud_stats_node = db.get_fraud_stats(node['id'])
-            
-            node_stats = {
-                'total_tx': tx_count,
-                'fraud_rate': fraud_stats_node['fraud_rate']
-            }
-            
-            with cols[idx % 3]:
-                render_node_card(node, node_stats)
+    st.fragment(render_node_status, run_every=run_every)()
     
     st.markdown("---")
     
     # Recent Transactions Section
     st.header("📋 Recent Transactions")
-    
-    max_display = config['dashboard']['max_transactions_display']
-    transactions = db.get_recent_transactions(limit=max_display, node_id=filter_node_id)
-    transactions_all = db.get_all_transactions(node_id=filter_node_id)
-    
-    if not transactions:
-        st.info("No transactions recorded yet. Waiting for data from fog nodes...")
-    else:
-        # Convert to DataFrame for better display
-        tx_df = pd.DataFrame(transactions)
-        
-        # Format timestamp  
-        if 'timestamp' in tx_df.columns:
-            tx_df['time_ago'] = tx_df['timestamp'].apply(format_timestamp)
-        
-        # Prepare display columns with key transaction data (Class removed)
-        display_cols = ['id', 'node_name', 'time', 'amount', 'time_ago']
-        
-        # Create clean display dataframe
-        display_data = []
-        for _, row in tx_df.head(20).iterrows():
-            display_data.append({
-                'ID': row['id'],
-                'Node': row['node_name'],
-                'Time': f"{row['time']:.0f}" if pd.notna(row.get('time')) else 'N/A',
-                'Amount': f"${row['amount']:.2f}" if pd.notna(row.get('amount')) else 'N/A',
-                'Recorded': row['time_ago']
-            })
-        
-        display_df = pd.DataFrame(display_data)
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
-        
-        # Transaction volume chart (use full history)
-        if len(transactions_all) > 0:
-            st.subheader("Transaction Volume Over Time")
-
-            tx_df = pd.DataFrame(transactions_all)
-            tx_df['timestamp_dt'] = pd.to_datetime(tx_df['timestamp'])
-            tx_df = tx_df.sort_values('timestamp_dt')
-
-            # Determine the time range of data
-            time_span = tx_df['timestamp_dt'].max() - tx_df['timestamp_dt'].min()
-            total_minutes = time_span.total_seconds() / 60
-
-            # Smart bucketing based on time range
-            if total_minutes <= 60:           # Less than 1 hour → 1-minute buckets
-                freq = '1min'
-                label = 'per Minute'
-            elif total_minutes <= 6*60:       # Less than 6 hours → 5-minute buckets
-                freq = '5min'
-                label = 'per 5 Minutes'
-            elif total_minutes <= 24*60:      # Less than 1 day → 10-minute buckets
-                freq = '10min'
-                label = 'per 10 Minutes'
-            elif total_minutes <= 7*24*60:    # Less than 1 week → 30-minute buckets
-                freq = '30min'
-                label = 'per 30 Minutes'
-            else:
-                freq = '1H'                   # More than a week → hourly
-                label = 'per Hour'
-
-            # Group by dynamic time buckets
-            tx_df['time_bucket'] = tx_df['timestamp_dt'].dt.floor(freq)
-            volume_data = tx_df.groupby('time_bucket').size().reset_index(name='count')
-
-            # Nice title
-            title = f"Transaction Volume {label}"
-
-            fig = px.line(
-                volume_data,
-                x='time_bucket',
-                y='count',
-                title=title,
-                labels={'time_bucket': 'Time', 'count': 'Transactions'},
-                markers=True
-            )
-            
-            # Improve readability
-            fig.update_layout(hovermode="x unified")
-            fig.update_traces(line=dict(width=2), marker=dict(size=6))
-
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Amount distribution (use full history)
-        if len(transactions_all) > 5:
-            st.subheader("Transaction Amount Distribution")
-            
-            tx_all_df = pd.DataFrame(transactions_all)
-            
-            if 'amount' in tx_all_df.columns:
-                fig = px.histogram(
-                    tx_all_df,
-                    x='amount',
-                nbins=20,
-                    title='Distribution of Transaction Amounts',
-                    labels={'amount': 'Amount ($)', 'count': 'Frequency'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
-    
+    st.fragment(render_transaction_table, run_every=run_every)(filter_node_id, max_display)
+    if show_charts:
+        st.fragment(render_volume_chart, run_every=run_every)(filter_node_id)
+        st.fragment(render_amount_hist, run_every=run_every)(filter_node_id)
     
     st.markdown("---")
     
     # Recent Fraud Results Section
     st.header("🚨 Recent Fraud Detection Results")
-    
-    fraud_results = db.get_recent_fraud_results(limit=max_display, node_id=filter_node_id)
-    fraud_results_all = db.get_all_fraud_results(node_id=filter_node_id)
-    
-    if not fraud_results:
-        st.info("No fraud detection results yet. Waiting for data from fog nodes...")
-    else:
-        # Convert to DataFrame
-        fraud_df = pd.DataFrame(fraud_results)
-        
-        # Format timestamp
-        if 'timestamp' in fraud_df.columns:
-            fraud_df['time_ago'] = fraud_df['timestamp'].apply(format_timestamp)
-        
-        # Add status emoji based on prediction (0 = legitimate, 1 = fraud)
-        fraud_df['status'] = fraud_df['prediction'].apply(lambda x: '🔴 FRAUD' if x == 1 else '🟢 LEGITIMATE')
-        fraud_df['is_fraud'] = fraud_df['prediction'].apply(lambda x: x == 1)
-        
-        # Prepare display data
-        display_data = []
-        for _, row in fraud_df.head(20).iterrows():
-            display_data.append({
-                'ID': row['id'],
-                'Node': row['node_name'],
-                'Status': row['status'],
-                'Time': f"{row['time']:.0f}" if pd.notna(row.get('time')) else 'N/A',
-                'Recorded': row['time_ago']
-            })
-        
-        display_df = pd.DataFrame(display_data)
-        
-        # Color code rows
-        def highlight_fraud(row):
-            if '🔴 FRAUD' in str(row['Status']):
-                return ['background-color: rgba(255, 0, 0, 0.1)'] * len(row)
-            else:
-                return ['background-color: rgba(0, 255, 0, 0.05)'] * len(row)
-        
-        styled_df = display_df.style.apply(highlight_fraud, axis=1)
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-        
-        # Fraud rate by node (use full history)
-        if len(fraud_results_all) > 0:
-            st.subheader("Fraud Rate by Node (Percent of fraud transaction from Total)")
-            
-            fraud_all_df = pd.DataFrame(fraud_results_all)
-            fraud_all_df['is_fraud'] = fraud_all_df['prediction'].apply(lambda x: x == 1)
-            
-            fraud_by_node = fraud_all_df.groupby('node_name').agg({
-                'is_fraud': ['count', 'sum']
-            }).reset_index()
-            
-            fraud_by_node.columns = ['node_name', 'total', 'fraud_count']
-            fraud_by_node['fraud_rate'] = (fraud_by_node['fraud_count'] / fraud_by_node['total'] * 100)
-            
-            fig = px.bar(
-                fraud_by_node,
-                x='node_name',
-                y='fraud_rate',
-                title='Fraud Rate by Fog Node (%)',
-                labels={'node_name': 'Node', 'fraud_rate': 'Fraud Rate (%)'},
-                color='fraud_rate',
-                color_continuous_scale='Reds'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+    st.fragment(render_fraud_table, run_every=run_every)(filter_node_id, max_display)
+    if show_charts:
+        st.fragment(render_fraud_bar, run_every=run_every)(filter_node_id)
     
     # Footer
     st.markdown("---")
-    st.caption(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Auto refresh
-    if auto_refresh:
-        time.sleep(refresh_interval)
-        st.rerun()
+    st.fragment(render_footer, run_every=run_every)()
 
 
 if __name__ == "__main__":
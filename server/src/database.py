@@ -4,28 +4,114 @@ Manages SQLite database operations for fog nodes, transactions, and fraud result
 """
 
 import sqlite3
+import queue
+import threading
+import logging
 import json
 import yaml
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable
 from contextlib import contextmanager
 import os
+import functools
+
+
+logger = logging.getLogger(__name__)
+
+# Current time as a Unix epoch (seconds, with sub-second precision)
+EPOCH_NOW_SQL = "((julianday('now') - 2440587.5) * 86400.0)"
+
+# Transaction payload keys (Time, V1-V28, Amount; Class removed) and their table columns
+TRANSACTION_PAYLOAD_KEYS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+TRANSACTION_COLUMNS = ['node_id'] + [key.lower() for key in TRANSACTION_PAYLOAD_KEYS]
+
+INSERT_TRANSACTION_SQL = f"""
+    INSERT INTO transactions ({', '.join(TRANSACTION_COLUMNS)}, epoch)
+    VALUES ({', '.join(['?'] * len(TRANSACTION_COLUMNS))}, {EPOCH_NOW_SQL})
+"""
+
+INSERT_FRAUD_RESULT_SQL = f"""
+    INSERT INTO fraud_results (transaction_id, node_id, time, prediction, epoch)
+    VALUES (?, ?, ?, ?, {EPOCH_NOW_SQL})
+"""
+
+UPDATE_FRAUD_STATS_SQL = """
+    INSERT INTO fraud_stats_cache (node_id, total, fraud_count) VALUES (?, ?, ?)
+    ON CONFLICT(node_id) DO UPDATE SET
+        total = total + excluded.total,
+        fraud_count = fraud_count + excluded.fraud_count
+"""
+
+UPSERT_NODE_SQL = """
+    INSERT INTO fog_nodes (id, name, location, description, node_string_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        location = excluded.location,
+        description = excluded.description,
+        node_string_id = excluded.node_string_id
+"""
+
+# Newest transaction / fraud result IDs: a seek on the primary key or on the (node_id, id) indexes
+CHANGE_TOKEN_SQL = """
+    SELECT (SELECT MAX(id) FROM transactions), (SELECT MAX(id) FROM fraud_results)
+"""
+
+NODE_CHANGE_TOKEN_SQL = """
+    SELECT (SELECT MAX(id) FROM transactions WHERE node_id = ?),
+           (SELECT MAX(id) FROM fraud_results WHERE node_id = ?)
+"""
+
+UPDATE_NODE_STATUS_SQL = f"""
+    UPDATE fog_nodes 
+    SET status = ?, last_seen_epoch = {EPOCH_NOW_SQL}
+    WHERE id = ?
+"""
 
 
 class DatabaseHandler:
     """Handles all database operations for the fog node monitoring system."""
     
-    def __init__(self, db_path: str = None):
+    # Number of long-lived connections kept open for concurrent readers (writers have their own)
+    POOL_SIZE = 4
+    
+    # Seconds between background WAL checkpoints (None disables the checkpoint thread)
+    CHECKPOINT_INTERVAL = 60
+    
+    def __init__(self, db_path: str = None, pool_size: int = POOL_SIZE,
+                 checkpoint_interval: Optional[float] = CHECKPOINT_INTERVAL):
         """Initialize database handler with given database path."""
         if db_path is None:
             # Load from config.yaml
             db_path = self.load_db_path_from_config()
         self.db_path = db_path
+        
+        # Every ":memory:" connection is a separate database, so share a single one
+        if db_path == ":memory:":
+            pool_size = 1
+        self._pool = queue.Queue()
+        # SQLite allows one writer at a time; serialize them here rather than spin on busy_timeout
+        self._write_lock = threading.RLock()
+        for _ in range(pool_size):
+            self._pool.put(self._open_connection())
+        # Dedicated writer connection, so a burst of reads never holds up an insert waiting for a pooled one
+        # (":memory:" writes go through the single shared connection instead)
+        self._writer = self._open_connection() if db_path != ":memory:" else None
+        
         self.init_database()
+        
+        # Periodically truncate the WAL file so it does not keep growing between automatic checkpoints
+        self._stop_checkpoints = threading.Event()
+        if checkpoint_interval and db_path != ":memory:":
+            threading.Thread(
+                target=self._checkpoint_loop, args=(checkpoint_interval,),
+                name="sqlite-checkpoint", daemon=True
+            ).start()
     
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def load_db_path_from_config(config_path: str = "config.yaml") -> str:
-        """Load database path from config file."""
+        """Load database path from config file (read once per path, then cached)."""
         try:
             # Handle both absolute and relative paths
             if not os.path.isabs(config_path):
@@ -34,31 +120,106 @@ class DatabaseHandler:
                 project_root = os.path.dirname(current_dir)
                 config_path = os.path.join(project_root, config_path)
             
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+            # libyaml's C loader when PyYAML was built with it, else the pure-Python one
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(config_path, 'rb') as f:
+                config = yaml.load(f, Loader=loader)
             return config['database']['path']
         except Exception as e:
             print(f"Warning: Could not load database path from config: {e}")
             print("Using default: fog_monitoring.db")
             return "fog_monitoring.db"
     
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_path)
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a connection tuned for concurrent readers alongside a writer."""
+        # Autocommit mode: transactions are opened explicitly in get_connection
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        # Wait for a concurrent writer's lock instead of failing with "database is locked"
+        conn.execute("PRAGMA busy_timeout=5000")
+        # WAL needs a file on disk; in-memory databases stay in their default journal mode
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Checkpoint automatically every ~40 MB of WAL; the checkpoint thread truncates it more often
+        conn.execute("PRAGMA wal_autocheckpoint=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
+    @contextmanager
+    def _acquire(self):
+        """Borrow a connection from the pool, blocking until one is free."""
+        conn = self._pool.get()
         try:
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
+        finally:
+            self._pool.put(conn)
+    
+    @contextmanager
+    def _acquire_writer(self):
+        """Use the dedicated writer connection (the caller holds the write lock)."""
+        if self._writer is None:
+            with self._acquire() as conn:
+                yield conn
+        else:
+            yield self._writer
+    
+    @contextmanager
+    def get_connection(self, write: bool = False):
+        """Context manager for database connections.
+        
+        Runs the block in a single transaction on a pooled reader connection.
+        Pass write=True for blocks that modify the database; they run on the writer connection.
+        """
+        # Writers hold the lock while they use the writer connection; readers take one from the pool
+        if write:
+            self._write_lock.acquire()
+        try:
+            with self._acquire_writer() if write else self._acquire() as conn:
+                # Writers take the RESERVED lock up front, so a conflicting writer waits
+                # (busy_timeout) at BEGIN instead of failing with SQLITE_BUSY mid-transaction
+                conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+                try:
+                    yield conn
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    conn.execute("ROLLBACK")
+                    raise e
+        finally:
+            if write:
+                self._write_lock.release()
+    
+    def _checkpoint_loop(self, interval: float):
+        """Run PRAGMA wal_checkpoint(TRUNCATE) every `interval` seconds on a dedicated connection."""
+        conn = self._open_connection()
+        try:
+            while not self._stop_checkpoints.wait(interval):
+                try:
+                    busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"WAL checkpoint failed: {e}")
+                    continue
+                if busy:
+                    logger.warning(f"WAL checkpoint blocked by readers/writers ({checkpointed}/{log_pages} pages)")
+                else:
+                    logger.debug(f"WAL checkpoint done ({checkpointed}/{log_pages} pages)")
         finally:
             conn.close()
     
+    def close(self):
+        """Stop the checkpoint thread and close the writer and all pooled connections."""
+        self._stop_checkpoints.set()
+        if self._writer is not None:
+            with self._write_lock:
+                self._writer.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+    
     def init_database(self):
         """Initialize database and create tables if they don't exist."""
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             cursor = conn.cursor()
             
             # Fog nodes table
@@ -70,13 +231,13 @@ class DatabaseHandler:
                     description TEXT,
                     node_string_id TEXT UNIQUE,
                     status TEXT DEFAULT 'offline',
-                    last_seen TIMESTAMP,
+                    last_seen_epoch REAL,
                     created_at TIMESTAMP DEFAULT (DATETIME(CURRENT_TIMESTAMP, '+1 hour'))
                 )
             """)
             
             # Transactions table - stores V1-V28 features, Time, Amount (Class removed)
-            cursor.execute("""
+            cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS transactions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     node_id INTEGER NOT NULL,
@@ -88,68 +249,132 @@ class DatabaseHandler:
                     v21 REAL, v22 REAL, v23 REAL, v24 REAL, v25 REAL,
                     v26 REAL, v27 REAL, v28 REAL,
                     amount REAL,
-                    timestamp TIMESTAMP DEFAULT (DATETIME(CURRENT_TIMESTAMP, '+1 hour')),
+                    epoch REAL NOT NULL DEFAULT ({EPOCH_NOW_SQL}),
                     FOREIGN KEY (node_id) REFERENCES fog_nodes(id)
                 )
             """)
             
             # Fraud results table - stores Time and Prediction
-            cursor.execute("""
+            cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS fraud_results (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     transaction_id INTEGER,
                     node_id INTEGER NOT NULL,
                     time REAL,
                     prediction INTEGER NOT NULL,
-                    timestamp TIMESTAMP DEFAULT (DATETIME(CURRENT_TIMESTAMP, '+1 hour')),
+                    epoch REAL NOT NULL DEFAULT ({EPOCH_NOW_SQL}),
                     FOREIGN KEY (transaction_id) REFERENCES transactions(id),
                     FOREIGN KEY (node_id) REFERENCES fog_nodes(id)
                 )
             """)
             
+            # Running fraud totals per node, kept in step with fraud_results by add_fraud_result
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS fraud_stats_cache (
+                    node_id INTEGER PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    fraud_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            
+            # Fill the cache from existing results the first time it is created
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM fraud_stats_cache)")
+            if not cursor.fetchone()[0]:
+                cursor.execute("""
+                    INSERT INTO fraud_stats_cache (node_id, total, fraud_count)
+                    SELECT node_id, COUNT(*), SUM(CASE WHEN prediction = 1 THEN 1 ELSE 0 END)
+                    FROM fraud_results
+                    GROUP BY node_id
+                """)
+            
+            # Databases from the first release store text timestamps ("timestamp" as UTC+1,
+            # "last_seen" as local time); add the epoch columns and backfill them from those
+            self._add_column_if_missing(cursor, 'fog_nodes', 'last_seen_epoch', 'REAL',
+                                        "CAST(strftime('%s', last_seen, 'utc') AS REAL)")
+            self._add_column_if_missing(cursor, 'transactions', 'epoch', 'REAL',
+                                        "CAST(strftime('%s', timestamp) AS REAL) - 3600")
+            self._add_column_if_missing(cursor, 'fraud_results', 'epoch', 'REAL',
+                                        "CAST(strftime('%s', timestamp) AS REAL) - 3600")
+            
             # Create indexes for better query performance
+            # (node_id, epoch) serves "WHERE node_id = ? ORDER BY epoch" without a sort;
+            # indexes on the old text timestamp (and single-column node_id) are no longer used
+            for old_index in ('idx_transactions_node_id', 'idx_fraud_results_node_id',
+                              'idx_tx_node_ts', 'idx_fraud_node_ts',
+                              'idx_transactions_timestamp', 'idx_fraud_results_timestamp'):
+                cursor.execute(f"DROP INDEX IF EXISTS {old_index}")
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_tx_node_epoch 
+                ON transactions(node_id, epoch DESC)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_transactions_epoch 
+                ON transactions(epoch)
+            """)
+            
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_transactions_node_id 
-                ON transactions(node_id)
+                CREATE INDEX IF NOT EXISTS idx_fraud_node_epoch 
+                ON fraud_results(node_id, epoch DESC)
             """)
             
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_transactions_timestamp 
-                ON transactions(timestamp)
+                CREATE INDEX IF NOT EXISTS idx_fraud_results_epoch 
+                ON fraud_results(epoch)
             """)
             
+            # (node_id, id) lets MAX(id) for one node seek straight to the answer (get_change_token)
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_fraud_results_node_id 
-                ON fraud_results(node_id)
+                CREATE INDEX IF NOT EXISTS idx_tx_node_id 
+                ON transactions(node_id, id)
             """)
             
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_fraud_results_timestamp 
-                ON fraud_results(timestamp)
+                CREATE INDEX IF NOT EXISTS idx_fraud_node_id 
+                ON fraud_results(node_id, id)
             """)
+            
+            # Refresh planner statistics (sampled, so startup stays fast on large tables)
+            cursor.execute("PRAGMA analysis_limit=1000")
+            cursor.execute("ANALYZE")
+    
+    @staticmethod
+    def _add_column_if_missing(cursor, table: str, column: str, definition: str, backfill: str = None):
+        """Add a column to a table created by an older schema, optionally backfilling it."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column in {row['name'] for row in cursor.fetchall()}:
+            return
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if backfill:
+            cursor.execute(f"UPDATE {table} SET {column} = {backfill}")
     
     # Fog Nodes Operations
     
     def add_or_update_node(self, node_id: int, name: str, location: str = "", description: str = "", node_string_id: str = None):
         """Add a new fog node or update existing one."""
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO fog_nodes (id, name, location, description, node_string_id)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(id) DO UPDATE SET
-                    name = excluded.name,
-                    location = excluded.location,
-                    description = excluded.description,
-                    node_string_id = excluded.node_string_id
-            """, (node_id, name, location, description, node_string_id))
+            cursor.execute(UPSERT_NODE_SQL, (node_id, name, location, description, node_string_id))
+    
+    def add_or_update_nodes_bulk(self, rows: List[tuple]) -> None:
+        """Add or update several fog nodes in a single database transaction.
+        
+        Args:
+            rows: (node_id, name, location, description, node_string_id) tuples
+        """
+        if not rows:
+            return
+        with self.get_connection(write=True) as conn:
+            conn.executemany(UPSERT_NODE_SQL, rows)
     
     def get_node_by_string_id(self, node_string_id: str):
         """Get a fog node by its string ID (e.g., 'Fog_Node_1')."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT id, name, location, description, node_string_id, status, last_seen, created_at
+                SELECT id, name, location, description, node_string_id, status,
+                       datetime(last_seen_epoch, 'unixepoch', 'localtime') as last_seen, last_seen_epoch, created_at
                 FROM fog_nodes
                 WHERE node_string_id = ?
             """, (node_string_id,))
@@ -157,21 +382,18 @@ class DatabaseHandler:
             return dict(row) if row else None
     
     def update_node_status(self, node_id: int, status: str = "online"):
-        """Update the status and last_seen timestamp of a fog node."""
-        with self.get_connection() as conn:
+        """Update the status and last seen time of a fog node."""
+        with self.get_connection(write=True) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE fog_nodes 
-                SET status = ?, last_seen = datetime('now', 'localtime')
-                WHERE id = ?
-            """, (status, node_id))
+            cursor.execute(UPDATE_NODE_STATUS_SQL, (status, node_id))
     
     def get_all_nodes(self) -> List[Dict]:
         """Get all fog nodes with their status."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT id, name, location, description, status, last_seen, created_at
+                SELECT id, name, location, description, status,
+                       datetime(last_seen_epoch, 'unixepoch', 'localtime') as last_seen, last_seen_epoch, created_at
                 FROM fog_nodes
                 ORDER BY id
             """)
@@ -183,7 +405,8 @@ class DatabaseHandler:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT id, name, location, description, status, last_seen, created_at
+                SELECT id, name, location, description, status,
+                       datetime(last_seen_epoch, 'unixepoch', 'localtime') as last_seen, last_seen_epoch, created_at
                 FROM fog_nodes
                 WHERE id = ?
             """, (node_id,))
@@ -192,33 +415,32 @@ class DatabaseHandler:
     
     # Transactions Operations
     
+    @staticmethod
+    def _transaction_values(node_id: int, transaction_data: Dict) -> tuple:
+        """Order a transaction payload's fields like TRANSACTION_COLUMNS."""
+        # map() pulls the fields in C; extra payload keys (e.g. Node_ID) are never looked at
+        return (node_id, *map(transaction_data.get, TRANSACTION_PAYLOAD_KEYS))
+    
     def add_transaction(self, node_id: int, transaction_data: Dict) -> int:
         """Add a new transaction with V1-V28 features (Class field removed)."""
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             cursor = conn.cursor()
-            
-            # Extract fields from transaction data
-            fields = ['node_id', 'time']
-            values = [node_id, transaction_data.get('Time')]
-            
-            # Add V1-V28 features
-            for i in range(1, 29):
-                fields.append(f'v{i}')
-                values.append(transaction_data.get(f'V{i}'))
-            
-            # Add Amount (Class removed)
-            fields.append('amount')
-            values.append(transaction_data.get('Amount'))
-            
-            # Build SQL query
-            placeholders = ', '.join(['?'] * len(fields))
-            columns = ', '.join(fields)
-            
-            cursor.execute(f"""
-                INSERT INTO transactions ({columns})
-                VALUES ({placeholders})
-            """, values)
-            return cursor.lastrowid
+            cursor.execute(INSERT_TRANSACTION_SQL + " RETURNING id", self._transaction_values(node_id, transaction_data))
+            return cursor.fetchone()[0]
+    
+    def add_transactions_bulk(self, node_id: int, rows: List[Dict]) -> List[int]:
+        """Add several transactions from one node in a single database transaction."""
+        if not rows:
+            return []
+        with self.get_connection(write=True) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                INSERT_TRANSACTION_SQL,
+                (self._transaction_values(node_id, row) for row in rows)
+            )
+            # The write lock keeps other inserts out, so the new IDs are consecutive
+            last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            return list(range(last_id - len(rows) + 1, last_id + 1))
     
     
     def get_recent_transactions(self, limit: int = 100, node_id: Optional[int] = None) -> List[Dict]:
@@ -231,7 +453,7 @@ class DatabaseHandler:
                     FROM transactions t
                     LEFT JOIN fog_nodes n ON t.node_id = n.id
                     WHERE t.node_id = ?
-                    ORDER BY t.timestamp DESC
+                    ORDER BY t.epoch DESC
                     LIMIT ?
                 """, (node_id, limit))
             else:
@@ -239,13 +461,35 @@ class DatabaseHandler:
                     SELECT t.*, n.name as node_name
                     FROM transactions t
                     LEFT JOIN fog_nodes n ON t.node_id = n.id
-                    ORDER BY t.timestamp DESC
+                    ORDER BY t.epoch DESC
                     LIMIT ?
                 """, (limit,))
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    def get_recent_transactions_df(self, limit: int = 100, node_id: Optional[int] = None):
+        """Get recent transactions as a pandas DataFrame, built column-wise by pandas."""
+        import pandas as pd  # only the dashboard needs DataFrames
+        
+        with self._acquire() as conn:
+            if node_id is not None:
+                return pd.read_sql_query("""
+                    SELECT t.*, n.name as node_name
+                    FROM transactions t
+                    LEFT JOIN fog_nodes n ON t.node_id = n.id
+                    WHERE t.node_id = ?
+                    ORDER BY t.epoch DESC
+                    LIMIT ?
+                """, conn, params=(node_id, limit))
+            return pd.read_sql_query("""
+                SELECT t.*, n.name as node_name
+                FROM transactions t
+                LEFT JOIN fog_nodes n ON t.node_id = n.id
+                ORDER BY t.epoch DESC
+                LIMIT ?
+            """, conn, params=(limit,))
+    
     def get_all_transactions(self, node_id: Optional[int] = None) -> List[Dict]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -255,14 +499,14 @@ class DatabaseHandler:
                     FROM transactions t
                     LEFT JOIN fog_nodes n ON t.node_id = n.id
                     WHERE t.node_id = ?
-                    ORDER BY t.timestamp
+                    ORDER BY t.epoch
                 """, (node_id,))
             else:
                 cursor.execute("""
                     SELECT t.*, n.name as node_name
                     FROM transactions t
                     LEFT JOIN fog_nodes n ON t.node_id = n.id
-                    ORDER BY t.timestamp
+                    ORDER BY t.epoch
                 """)
             
             rows = cursor.fetchall()
@@ -277,8 +521,114 @@ class DatabaseHandler:
             else:
                 cursor.execute("SELECT COUNT(*) FROM transactions")
             return cursor.fetchone()[0]
+
+    def get_transaction_counts_by_node(self) -> Dict[int, int]:
+        """Get transaction counts for all nodes in a single grouped query."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT node_id, COUNT(*) as total
+                FROM transactions
+                GROUP BY node_id
+            """)
+            return {row['node_id']: row['total'] for row in cursor.fetchall()}
+
+    def get_transaction_time_range(self, node_id: Optional[int] = None) -> Tuple[Optional[float], Optional[float]]:
+        """Get the first and last transaction epoch timestamps, optionally for a specific node."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if node_id is not None:
+                cursor.execute("""
+                    SELECT MIN(epoch), MAX(epoch)
+                    FROM transactions
+                    WHERE node_id = ?
+                """, (node_id,))
+            else:
+                cursor.execute("SELECT MIN(epoch), MAX(epoch) FROM transactions")
+            first, last = cursor.fetchone()
+            return first, last
+
+    def get_transaction_volume(self, bucket_seconds: int, node_id: Optional[int] = None) -> List[Dict]:
+        """Count transactions per time bucket, optionally for a specific node.
+        
+        Args:
+            bucket_seconds: Size of each time bucket in seconds
+            node_id: Optional ID of the fog node to filter on
+        
+        Returns:
+            List of {'time_bucket', 'count'} rows ordered by time_bucket (bucket start as epoch)
+        """
+        bucket_expr = "CAST(epoch / ? AS INTEGER) * ?"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if node_id is not None:
+                cursor.execute(f"""
+                    SELECT {bucket_expr} as time_bucket, COUNT(*) as count
+                    FROM transactions
+                    WHERE node_id = ?
+                    GROUP BY time_bucket
+                    ORDER BY time_bucket
+                """, (bucket_seconds, bucket_seconds, node_id))
+            else:
+                cursor.execute(f"""
+                    SELECT {bucket_expr} as time_bucket, COUNT(*) as count
+                    FROM transactions
+                    GROUP BY time_bucket
+                    ORDER BY time_bucket
+                """, (bucket_seconds, bucket_seconds))
+            
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
     
-    
+    def get_amount_histogram(self, bins: int = 20, node_id: Optional[int] = None) -> List[Dict]:
+        """Count transaction amounts in equal-width bins, optionally for a specific node.
+        
+        Args:
+            bins: Number of bins between the smallest and largest amount
+            node_id: Optional ID of the fog node to filter on
+        
+        Returns:
+            List of {'amount', 'count'} rows (bin center), one per bin; empty if there are no amounts
+        """
+        where = "WHERE amount IS NOT NULL" + (" AND node_id = ?" if node_id is not None else "")
+        params = (node_id,) if node_id is not None else ()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # Probe the range first, then let SQLite do the binning: only `bins` rows come back
+            cursor.execute(f"SELECT MIN(amount), MAX(amount), COUNT(*) FROM transactions {where}", params)
+            low, high, total = cursor.fetchone()
+            if not total:
+                return []
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            width = (high - low) / bins
+            # The largest amount falls in the last bin, as with np.histogram
+            cursor.execute(f"""
+                SELECT MIN(CAST((amount - ?) / ? AS INTEGER), ?) as bin, COUNT(*) as count
+                FROM transactions
+                {where}
+                GROUP BY bin
+            """, (low, width, bins - 1) + params)
+            counts = dict(cursor.fetchall())
+        return [{'amount': low + (i + 0.5) * width, 'count': counts.get(i, 0)} for i in range(bins)]
+
+
+    def get_change_token(self, node_id: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+        """Get the newest transaction and fraud result IDs, optionally for a specific node.
+        
+        The pair only changes when new rows are stored, so callers can use it
+        to detect whether anything needs to be re-queried.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if node_id is not None:
+                cursor.execute(NODE_CHANGE_TOKEN_SQL, (node_id, node_id))
+            else:
+                cursor.execute(CHANGE_TOKEN_SQL)
+            max_tx_id, max_fraud_id = cursor.fetchone()
+            return max_tx_id, max_fraud_id
+
+
     # Fraud Results Operations
     
     def add_fraud_result(self, node_id: int, prediction: int, time: float = None, 
@@ -291,13 +641,42 @@ class DatabaseHandler:
             time: Time value from fog node
             transaction_id: Optional ID of associated transaction
         """
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO fraud_results (transaction_id, node_id, time, prediction)
-                VALUES (?, ?, ?, ?)
-            """, (transaction_id, node_id, time, prediction))
-            return cursor.lastrowid
+            cursor.execute(INSERT_FRAUD_RESULT_SQL + " RETURNING id", (transaction_id, node_id, time, prediction))
+            fraud_id = cursor.fetchone()[0]
+            # Same transaction, so the cached totals never drift from fraud_results
+            cursor.execute(UPDATE_FRAUD_STATS_SQL, (node_id, 1, 1 if prediction == 1 else 0))
+            return fraud_id
+    
+    def add_batch(self, transaction_rows: List[tuple], fraud_results: List[tuple],
+                  online_nodes: Optional[Iterable[int]] = None) -> None:
+        """Store a batch of transactions and fraud results in a single database transaction.
+        
+        Args:
+            transaction_rows: (node_id, Time, V1, ..., V28, Amount) tuples
+            fraud_results: (node_id, time, prediction) tuples
+            online_nodes: Node ids to mark online (default: every node with data in the batch)
+        """
+        # Fold the fraud results into one stats increment per node
+        stats = {}
+        for node_id, _, prediction in fraud_results:
+            total, fraud_count = stats.get(node_id, (0, 0))
+            stats[node_id] = (total + 1, fraud_count + (1 if prediction == 1 else 0))
+        if online_nodes is None:
+            online_nodes = {row[0] for row in transaction_rows} | {result[0] for result in fraud_results}
+        
+        with self.get_connection(write=True) as conn:
+            conn.executemany(INSERT_TRANSACTION_SQL, transaction_rows)
+            conn.executemany(
+                INSERT_FRAUD_RESULT_SQL,
+                ((None, node_id, time, prediction) for node_id, time, prediction in fraud_results)
+            )
+            conn.executemany(
+                UPDATE_FRAUD_STATS_SQL,
+                ((node_id, total, fraud_count) for node_id, (total, fraud_count) in stats.items())
+            )
+            conn.executemany(UPDATE_NODE_STATUS_SQL, (('online', node_id) for node_id in online_nodes))
     
     
     def get_recent_fraud_results(self, limit: int = 100, node_id: Optional[int] = None) -> List[Dict]:
@@ -310,7 +689,7 @@ class DatabaseHandler:
                     FROM fraud_results f
                     LEFT JOIN fog_nodes n ON f.node_id = n.id
                     WHERE f.node_id = ?
-                    ORDER BY f.timestamp DESC
+                    ORDER BY f.epoch DESC
                     LIMIT ?
                 """, (node_id, limit))
             else:
@@ -318,13 +697,35 @@ class DatabaseHandler:
                     SELECT f.*, n.name as node_name
                     FROM fraud_results f
                     LEFT JOIN fog_nodes n ON f.node_id = n.id
-                    ORDER BY f.timestamp DESC
+                    ORDER BY f.epoch DESC
                     LIMIT ?
                 """, (limit,))
             
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    def get_recent_fraud_results_df(self, limit: int = 100, node_id: Optional[int] = None):
+        """Get recent fraud results as a pandas DataFrame, built column-wise by pandas."""
+        import pandas as pd  # only the dashboard needs DataFrames
+        
+        with self._acquire() as conn:
+            if node_id is not None:
+                return pd.read_sql_query("""
+                    SELECT f.*, n.name as node_name
+                    FROM fraud_results f
+                    LEFT JOIN fog_nodes n ON f.node_id = n.id
+                    WHERE f.node_id = ?
+                    ORDER BY f.epoch DESC
+                    LIMIT ?
+                """, conn, params=(node_id, limit))
+            return pd.read_sql_query("""
+                SELECT f.*, n.name as node_name
+                FROM fraud_results f
+                LEFT JOIN fog_nodes n ON f.node_id = n.id
+                ORDER BY f.epoch DESC
+                LIMIT ?
+            """, conn, params=(limit,))
+    
     def get_all_fraud_results(self, node_id: Optional[int] = None) -> List[Dict]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -334,14 +735,14 @@ class DatabaseHandler:
                     FROM fraud_results f
                     LEFT JOIN fog_nodes n ON f.node_id = n.id
                     WHERE f.node_id = ?
-                    ORDER BY f.timestamp
+                    ORDER BY f.epoch
                 """, (node_id,))
             else:
                 cursor.execute("""
                     SELECT f.*, n.name as node_name
                     FROM fraud_results f
                     LEFT JOIN fog_nodes n ON f.node_id = n.id
-                    ORDER BY f.timestamp
+                    ORDER BY f.epoch
                 """)
             
             rows = cursor.fetchall()
@@ -349,24 +750,24 @@ class DatabaseHandler:
     
     
     def get_fraud_stats(self, node_id: Optional[int] = None) -> Dict:
-        """Get fraud statistics, optionally for a specific node."""
+        """Get fraud statistics, optionally for a specific node (read from fraud_stats_cache)."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
             if node_id is not None:
                 cursor.execute("""
                     SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN prediction = 1 THEN 1 ELSE 0 END) as fraud_count
-                    FROM fraud_results
+                        COALESCE(SUM(total), 0) as total,
+                        COALESCE(SUM(fraud_count), 0) as fraud_count
+                    FROM fraud_stats_cache
                     WHERE node_id = ?
                 """, (node_id,))
             else:
                 cursor.execute("""
                     SELECT 
-                        COUNT(*) as total,
-                        SUM(CASE WHEN prediction = 1 THEN 1 ELSE 0 END) as fraud_count
-                    FROM fraud_results
+                        COALESCE(SUM(total), 0) as total,
+                        COALESCE(SUM(fraud_count), 0) as fraud_count
+                    FROM fraud_stats_cache
                 """)
             
             row = cursor.fetchone()
@@ -374,6 +775,22 @@ class DatabaseHandler:
             data['fraud_rate'] = (data['fraud_count'] / data['total'] * 100) if data['total'] > 0 else 0
             return data
 
+    def get_fraud_stats_by_node(self) -> Dict[int, Dict]:
+        """Get fraud statistics for all nodes in a single query (read from fraud_stats_cache)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT node_id, total, fraud_count
+                FROM fraud_stats_cache
+            """)
+
+            stats = {}
+            for row in cursor.fetchall():
+                data = dict(row)
+                node_id = data.pop('node_id')
+                data['fraud_rate'] = (data['fraud_count'] / data['total'] * 100) if data['total'] > 0 else 0
+                stats[node_id] = data
+            return stats
 
 if __name__ == "__main__":
     # Test database operations
@@ -382,11 +799,28 @@ if __name__ == "__main__":
     # Add test nodes
     db.add_or_update_node(1, "Fog Node 1", "Location A", "Test node 1")
     db.add_or_update_node(2, "Fog Node 2", "Location B", "Test node 2")
+    db.add_or_update_nodes_bulk([(3, "Fog Node 3", "Location C", "Test node 3", "Fog_Node_3")])
+    assert db.get_node_by_string_id("Fog_Node_3")['id'] == 3
     
     # Test transaction
     tx_id = db.add_transaction(1, {"amount": 100.50, "type": "payment"})
     print(f"Added transaction with ID: {tx_id}")
     
+    # Test bulk insert
+    bulk_ids = db.add_transactions_bulk(2, [{"Time": i, "Amount": 10.0 * i} for i in range(5)])
+    assert bulk_ids == list(range(tx_id + 1, tx_id + 6)), bulk_ids
+    print(f"Added bulk transactions with IDs: {bulk_ids}")
+    
+    # Histogram bins must match NumPy's
+    import numpy as np
+    amounts = [tx['amount'] for tx in db.get_all_transactions() if tx['amount'] is not None]
+    counts, _ = np.histogram(amounts, bins=20)
+    assert [row['count'] for row in db.get_amount_histogram(20)] == counts.tolist()
+    
+    # Test batch of transactions and fraud results
+    db.add_batch([(2, 1.0) + (0.0,) * 28 + (5.0,)], [(2, 1.0, 1), (2, 2.0, 0)])
+    assert db.get_fraud_stats(2)['total'] == 2 and db.get_node_by_id(2)['status'] == 'online'
+    
     # Test fraud result
     fraud_id = db.add_fraud_result(1, True, 0.95, tx_id)
     print(f"Added fraud result with ID: {fraud_id}")
@@ -402,4 +836,47 @@ if __name__ == "__main__":
     stats = db.get_fraud_stats()
     print(f"\nFraud stats: {stats}")
     
+    # Cached stats must match a full recount of fraud_results
+    with db._acquire() as conn:
+        total, fraud_count = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(prediction = 1), 0) FROM fraud_results"
+        ).fetchone()
+    assert (stats['total'], stats['fraud_count']) == (total, fraud_count), stats
+    
+    # Check the recent-rows queries use the composite indexes (no full scan, no sort)
+    with db._acquire() as conn:
+        for table, index in (("transactions", "idx_tx_node_epoch"), ("fraud_results", "idx_fraud_node_epoch")):
+            plan = " | ".join(row[3] for row in conn.execute(f"""
+                EXPLAIN QUERY PLAN
+                SELECT t.*, n.name as node_name
+                FROM {table} t
+                LEFT JOIN fog_nodes n ON t.node_id = n.id
+                WHERE t.node_id = ?
+                ORDER BY t.epoch DESC
+                LIMIT ?
+            """, (1, 20)))
+            assert f"SEARCH t USING INDEX {index}" in plan and "TEMP B-TREE" not in plan, plan
+            print(f"\nQuery plan for recent {table}: {plan}")
+    
+    # The per-node change token must not scan the node's rows: its cost stays flat as the tables grow
+    def token_steps(conn):
+        steps = [0]
+        def count():
+            steps[0] += 1
+        conn.set_progress_handler(count, 1)
+        try:
+            assert tuple(conn.execute(NODE_CHANGE_TOKEN_SQL, (2, 2)).fetchone()) == db.get_change_token(2)
+        finally:
+            conn.set_progress_handler(None, 1)
+        return steps[0]
+    
+    with db._acquire() as conn:
+        steps_before = token_steps(conn)
+    db.add_batch([(2, float(i)) + (0.0,) * 28 + (1.0,) for i in range(2000)],
+                 [(2, float(i), 0) for i in range(2000)])
+    with db._acquire() as conn:
+        steps_after = token_steps(conn)
+    assert steps_after <= steps_before + 5, (steps_before, steps_after)
+    print(f"\nPer-node change token: {steps_after} VM steps after 2000 more rows per table")
+    
     print("\nDatabase operations test completed successfully!")
@@ -0,0 +1,33 @@
+import os
+import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+def main():
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    models_dir = os.path.join(project_root, "models")
+    model_path = os.path.join(models_dir, "best_model_random_forest.pkl")
+    onnx_path = os.path.join(models_dir, "best_model_random_forest.onnx")
+
+    model = joblib.load(model_path)
+
+    # Input: scaled features as float32, one row per transaction.
+    # zipmap disabled so the probabilities come out as a plain tensor.
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, model.n_features_in_]))],
+        options={id(model): {"zipmap": False}},
+    )
+
+    # Saved next to the pickle, so the FTP server distributes it to the fog nodes.
+    # Not quantized: int8 quantization only covers MatMul/Conv weights, not tree ensembles.
+    with open(onnx_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    print(f"ONNX model written to {onnx_path}")
+
+if __name__ == "__main__":
+    main()
+
+# Run with (after training the model in the notebook):
+# python.exe .\src\export_onnx.py
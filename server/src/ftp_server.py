@@ -3,21 +3,49 @@ from pyftpdlib.authorizers import DummyAuthorizer
 from pyftpdlib.handlers import FTPHandler
 from pyftpdlib.servers import FTPServer
 
+def link_or_copy_file(src, dst):
+    """Hardlink a file (no data copied), else copy it (skipped if the copy is already up to date)."""
+    import shutil
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        # copy2 keeps the modification time, so an unchanged copy has the same size and mtime
+        src_stat, dst_stat = os.stat(src), os.stat(dst)
+        if (src_stat.st_size, src_stat.st_mtime) == (dst_stat.st_size, dst_stat.st_mtime):
+            return
+        # Outdated link or copy (e.g. the model was retrained): replace it
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. different filesystem / drive
+        shutil.copy2(src, dst)
+
 def create_symlink_or_copy(src, dst):
-    """Create symlink if supported, else copy file."""
+    """Create symlink if supported, else hardlink (or copy) the file or directory tree."""
     if os.name != "nt":  # Windows does not allow symlink without admin
         try:
             os.symlink(src, dst)
             return
         except:
             pass
-    # fallback: create a copy
+    # fallback: mirror the directory tree and hardlink each file
     if os.path.isdir(src):
-        import shutil
-        shutil.copytree(src, dst, dirs_exist_ok=True)
+        for dirpath, _, filenames in os.walk(src):
+            target_dir = os.path.join(dst, os.path.relpath(dirpath, src))
+            os.makedirs(target_dir, exist_ok=True)
+            for filename in filenames:
+                link_or_copy_file(os.path.join(dirpath, filename), os.path.join(target_dir, filename))
     else:
-        import shutil
-        shutil.copy2(src, dst)
+        link_or_copy_file(src, dst)
+
+def list_dir(path):
+    """Names of the entries in a directory (empty if it does not exist)."""
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
 
 def main():
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -31,24 +59,31 @@ def main():
     # Fog node list
     fog_nodes = [1, 2]
 
+    # List the source data and the existing node folders once instead of stat()-ing each path
+    available_data = list_dir(data_dir)
+    existing_nodes = list_dir(ftp_root)
+
     for node in fog_nodes:
-        node_dir = os.path.join(ftp_root, f"fognode{node}")
-        models_link = os.path.join(node_dir, "models")
+        node_name = f"fognode{node}"
+        node_dir = os.path.join(ftp_root, node_name)
         data_subdir = os.path.join(node_dir, "data")
-        data_file_src = os.path.join(data_dir, f"simulation_node_{node}.csv")
-        data_file_dst = os.path.join(data_subdir, f"simulation_node_{node}.csv")
+        data_file = f"simulation_node_{node}.csv"
 
         # Create directories
-        os.makedirs(node_dir, exist_ok=True)
         os.makedirs(data_subdir, exist_ok=True)
+        node_entries = list_dir(node_dir) if node_name in existing_nodes else set()
+        node_data = list_dir(data_subdir) if "data" in node_entries else set()
 
-        # Create symlink/copy to models (shared folder)
-        if not os.path.exists(models_link):
-            create_symlink_or_copy(models_dir, models_link)
+        # Create symlink/copy to models (shared folder). A hardlinked/copied tree is mirrored again
+        # on every start, so models added later (e.g. the ONNX export) reach existing nodes;
+        # files already linked are skipped, and a symlink follows the folder by itself
+        node_models = os.path.join(node_dir, "models")
+        if not os.path.islink(node_models):
+            create_symlink_or_copy(models_dir, node_models)
 
-        # Copy the correct simulation file
-        if os.path.exists(data_file_src):
-            create_symlink_or_copy(data_file_src, data_file_dst)
+        # Link the correct simulation file (once)
+        if data_file in available_data and data_file not in node_data:
+            create_symlink_or_copy(os.path.join(data_dir, data_file), os.path.join(data_subdir, data_file))
 
     # FTP User Setup
     authorizer = DummyAuthorizer()
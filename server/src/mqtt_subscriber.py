@@ -7,8 +7,35 @@ import paho.mqtt.client as mqtt
 import yaml
 import json
 import logging
+import threading
+import time
+from collections import deque
+# orjson parses the payload bytes directly and much faster; stdlib json also accepts bytes
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+_loads = _json.loads
 from datetime import datetime
-from database import DatabaseHandler
+from typing import Dict, List, Optional, Tuple, Union
+from database import DatabaseHandler, TRANSACTION_PAYLOAD_KEYS
+
+# msgspec (optional) decodes raw data straight into typed row tuples, checking each row while parsing
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    # One row: Time, V1..V28, Amount (null allowed, e.g. a NaN serialized by orjson, stored as NULL)
+    RawRow = Tuple[(Optional[float],) * len(TRANSACTION_PAYLOAD_KEYS)]
+    # {"Rows": [row, ...]}, or a single named row; Node_ID on the bare topic
+    _loads_raw_data = msgspec.json.Decoder(Dict[str, Union[str, float, None, List[RawRow]]]).decode
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    _DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError)
+else:
+    _loads_raw_data = _loads
+    _DECODE_ERRORS = (json.JSONDecodeError,)
 
 
 # Set up logging
@@ -22,20 +49,51 @@ logger = logging.getLogger(__name__)
 class MQTTSubscriber:
     """MQTT subscriber that processes messages and stores them in the database."""
     
+    # Messages are queued and written by a background thread; it is woken up once BATCH_SIZE rows are waiting
+    BATCH_SIZE = 200
+    # Seconds between flushes when the queues stay below BATCH_SIZE
+    FLUSH_INTERVAL = 0.05
+    # Minimum seconds between two "online" status writes for the same node
+    STATUS_INTERVAL = 5.0
+    # Most rows kept waiting in each queue; once full (database stalled), new messages are dropped and counted
+    MAX_QUEUED = 10_000
+    
     def __init__(self, config_path: str = "config.yaml"):
         """Initialize MQTT subscriber with configuration."""
         self.config = self.load_config(config_path)
         self.db = DatabaseHandler(self.config['database']['path'])
         self.client = None
         
+        # Subscribed topic -> (handler, payload decoder), so messages are routed with one dict lookup
+        topics = self.config['mqtt']['topics']
+        self._topic_handlers = {
+            topics['raw_data']: (self.handle_raw_data, _loads_raw_data),
+            topics['fraud_results']: (self.handle_fraud_result, _loads),
+        }
+        
+        # Rows waiting for the flusher thread: (node_id, Time, V1..V28, Amount) / (node_id, time, prediction)
+        self._tx_queue = deque()
+        self._fraud_queue = deque()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flusher_loop, name="db-flusher", daemon=True)
+        # node_id -> time.monotonic() of its last status write (only touched by the flushing thread)
+        self._last_status_write = {}
+        # Rows dropped because their queue was full (counted by the MQTT thread, reported by flush())
+        self.dropped_transactions = 0
+        self.dropped_fraud_results = 0
+        self._reported_drops = (0, 0)
+        
         # Initialize fog nodes in database from config
         self.init_fog_nodes()
         
     def load_config(self, config_path: str) -> dict:
         """Load configuration from YAML file."""
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+            # libyaml's C loader when PyYAML was built with it, else the pure-Python one
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(config_path, 'rb') as f:
+                config = yaml.load(f, Loader=loader)
             logger.info(f"Configuration loaded from {config_path}")
             return config
         except Exception as e:
@@ -44,16 +102,17 @@ class MQTTSubscriber:
     
     def init_fog_nodes(self):
         """Initialize fog nodes in database from configuration."""
-        for node in self.config['fog_nodes']:
-            # Create node_string_id from node name (e.g., "Fog Node 1" -> "Fog_Node_1")
-            node_string_id = node['name'].replace(' ', '_')
-            self.db.add_or_update_node(
-                node['id'],
-                node['name'],
-                node.get('location', ''),
-                node.get('description', ''),
-                node_string_id
-            )
+        # Create node_string_id from node name (e.g., "Fog Node 1" -> "Fog_Node_1")
+        rows = [
+            (node['id'], node['name'], node.get('location', ''), node.get('description', ''),
+             node['name'].replace(' ', '_'))
+            for node in self.config['fog_nodes']
+        ]
+        # All nodes are upserted in one transaction
+        self.db.add_or_update_nodes_bulk(rows)
+        
+        # node_string_id -> numeric node id, so messages are mapped without a database query
+        self._node_id_cache = {row[4]: row[0] for row in rows}
         logger.info(f"Initialized {len(self.config['fog_nodes'])} fog nodes in database")
     
     def on_connect(self, client, userdata, flags, rc):
@@ -64,12 +123,20 @@ class MQTTSubscriber:
             # Subscribe to topics
             raw_data_topic = self.config['mqtt']['topics']['raw_data']
             fraud_results_topic = self.config['mqtt']['topics']['fraud_results']
+            raw_data_qos = self.config['mqtt'].get('raw_data_qos', 0)
+            fraud_results_qos = self.config['mqtt'].get('fraud_results_qos', 0)
             
-            client.subscribe(raw_data_topic)
-            client.subscribe(fraud_results_topic)
+            # QoS 0 by default: no PUBACK round-trip per message (the fog nodes publish at QoS 0 anyway)
+            # Each topic is subscribed bare (Node_ID in the payload) and per node ("<topic>/<Node_ID>")
+            client.subscribe([
+                (raw_data_topic, raw_data_qos),
+                (f"{raw_data_topic}/+", raw_data_qos),
+                (fraud_results_topic, fraud_results_qos),
+                (f"{fraud_results_topic}/+", fraud_results_qos),
+            ])
             
-            logger.info(f"Subscribed to topic: {raw_data_topic}")
-            logger.info(f"Subscribed to topic: {fraud_results_topic}")
+            logger.info(f"Subscribed to topic: {raw_data_topic} (and {raw_data_topic}/+)")
+            logger.info(f"Subscribed to topic: {fraud_results_topic} (and {fraud_results_topic}/+)")
         else:
             logger.error(f"Connection failed with code {rc}")
     
@@ -80,94 +147,196 @@ class MQTTSubscriber:
         else:
             logger.info("Disconnected from MQTT broker")
     
+    def resolve_node_id(self, node_string_id: str):
+        """Map a string node id (e.g. "Fog_Node_1") to the numeric id, or None if the node is unknown."""
+        node_id = self._node_id_cache.get(node_string_id)
+        if node_id is None:
+            # Nodes added to the database after startup are looked up once, then cached
+            node = self.db.get_node_by_string_id(node_string_id)
+            if not node:
+                logger.warning("Unknown Node_ID '%s', skipping message", node_string_id)
+                return None
+            node_id = self._node_id_cache[node_string_id] = node['id']
+        return node_id
+    
     def on_message(self, client, userdata, msg):
         """Callback when a message is received."""
         try:
             topic = msg.topic
-            payload = json.loads(msg.payload.decode('utf-8'))
             
-            logger.debug(f"Received message on topic '{topic}': {payload}")
+            # Dispatch on the exact topic the message came from, or on its parent for "<topic>/<Node_ID>"
+            node_string_id = None
+            route = self._topic_handlers.get(topic)
+            if route is None:
+                parent_topic, _, node_string_id = topic.rpartition('/')
+                route = self._topic_handlers.get(parent_topic)
+            if route is None:
+                logger.warning("Received message from unknown topic: %s", topic)
+                return
+            handler, loads = route
             
-            # Extract Node_ID from payload (string format like "Fog_Node_1")
-            node_string_id = payload.get('Node_ID')
+            # Node named by the topic: resolved before parsing, so unknown nodes cost no JSON decode
+            if node_string_id is not None:
+                node_id = self.resolve_node_id(node_string_id)
+                if node_id is None:
+                    return
             
-            if not node_string_id:
-                logger.warning(f"No Node_ID in payload from topic '{topic}', skipping message")
-                return
+            payload = loads(msg.payload)
             
-            # Map string node_id to numeric id
-            node = self.db.get_node_by_string_id(node_string_id)
-            if not node:
-                logger.warning(f"Unknown Node_ID '{node_string_id}', skipping message")
-                return
+            # Lazy formatting: the payload is only turned into a str when DEBUG is enabled
+            logger.debug("Received message on topic '%s': %s", topic, payload)
             
-            node_id = node['id']
-
-            # Determine which topic type the message came from
-            if 'raw' in topic:
-                self.handle_raw_data(payload, node_id)
-            elif 'results' in topic:
-                self.handle_fraud_result(payload, node_id)
-            else:
-                logger.warning(f"Received message from unknown topic: {topic}")
+            if node_string_id is None:
+                # Bare topic: extract Node_ID from payload (string format like "Fog_Node_1")
+                node_string_id = payload.get('Node_ID')
+                if not node_string_id:
+                    logger.warning("No Node_ID in payload from topic '%s', skipping message", topic)
+                    return
+                node_id = self.resolve_node_id(node_string_id)
+                if node_id is None:
+                    return
+            
+            handler(payload, node_id)
                 
-        except json.JSONDecodeError as e:
+        except _DECODE_ERRORS as e:
             logger.error(f"Failed to decode JSON message: {e}")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
     
     
     def handle_raw_data(self, payload: dict, node_id: int):
-        """Handle raw transaction data message.
+        """Handle raw transaction data message (queued for the flusher thread).
         
-        Expected format:
+        Expected format, a batch of rows from the fog node (values in Time, V1-V28, Amount order),
+        published to "<raw_data topic>/Fog_Node_1":
+        {'Rows': [[70178, -0.443, ..., -0.072, 11.99], ...]}
+        On the bare raw_data topic the payload also carries 'Node_ID': 'Fog_Node_1'.
+        A single named row is accepted too:
         {'Time': 70178, 'V1': -0.443, ..., 'V28': -0.072, 'Amount': 11.99, 'Node_ID': 'Fog_Node_1'}
         Note: Class field has been removed from the data
         """
         try:
-            # Payload has all the V1-V28 features, Time, Amount (Class removed)
-            # Just pass it directly to the database
-            tx_id = self.db.add_transaction(node_id, payload)
+            rows = payload.get('Rows')
+            count = len(rows) if rows is not None else 1
+            if len(self._tx_queue) + count > self.MAX_QUEUED:
+                self.dropped_transactions += count
+                self._flush_event.set()
+                return
             
-            # Update node status to online
-            self.db.update_node_status(node_id, 'online')
+            if rows is not None:
+                if msgspec is not None:
+                    # msgspec decoded the rows as tuples: prepend node_id by tuple concatenation, without a Python loop
+                    self._tx_queue.extend(map((node_id,).__add__, rows))
+                else:
+                    self._tx_queue.extend((node_id, *row) for row in rows)
+            else:
+                # Payload has all the V1-V28 features, Time, Amount (Class removed); Node_ID is dropped
+                self._tx_queue.append((node_id, *map(payload.get, TRANSACTION_PAYLOAD_KEYS)))
             
-            amount = payload.get('Amount', 'N/A')
-            time = payload.get('Time', 'N/A')
-            node_string_id = payload.get('Node_ID', 'N/A')
-            logger.info(f"Added transaction {tx_id} from {node_string_id} (node_id={node_id}, Amount: {amount}, Time: {time})")
+            if len(self._tx_queue) >= self.BATCH_SIZE:
+                self._flush_event.set()
             
         except Exception as e:
             logger.error(f"Error handling raw data: {e}")
     
     
     def handle_fraud_result(self, payload: dict, node_id: int):
-        """Handle fraud detection result message.
+        """Handle fraud detection result message (queued for the flusher thread).
         
-        Expected format:
-        {'Node_ID': 'Fog_Node_1', 'Time': 70178, 'Prediction': 0}  # 0 = legitimate, 1 = fraud
+        Expected format, published to "<fraud_results topic>/Fog_Node_1":
+        {'Time': 70178, 'Prediction': 0}  # 0 = legitimate, 1 = fraud
+        On the bare fraud_results topic the payload also carries 'Node_ID': 'Fog_Node_1'.
         """
         try:
+            if len(self._fraud_queue) >= self.MAX_QUEUED:
+                self.dropped_fraud_results += 1
+                self._flush_event.set()
+                return
+            
+            # Coerce the fields now: a value SQLite cannot bind would fail the whole flushed batch
             time = payload.get('Time')
-            prediction = payload.get('Prediction', 0)
-            node_string_id = payload.get('Node_ID', 'N/A')
-            
-            # Add fraud result to database
-            fraud_id = self.db.add_fraud_result(
-                node_id=node_id,
-                prediction=prediction,
-                time=time
-            )
+            if time is not None:
+                time = float(time)
+            prediction = int(payload.get('Prediction', 0))
+            self._fraud_queue.append((node_id, time, prediction))
             
-            # Update node status to online
-            self.db.update_node_status(node_id, 'online')
+            if prediction == 1:
+                logger.info("FRAUD reported by node %s (Time: %s)", node_id, time)
             
-            fraud_status = "FRAUD" if prediction == 1 else "LEGITIMATE"
-            logger.info(f"Added fraud result {fraud_id} from {node_string_id} (node_id={node_id}): {fraud_status} (Time: {time})")
+            if len(self._fraud_queue) >= self.BATCH_SIZE:
+                self._flush_event.set()
             
         except Exception as e:
             logger.error(f"Error handling fraud result: {e}")
     
+    @staticmethod
+    def _pop_batch(items: deque, limit: int) -> list:
+        """Pop up to `limit` items from the left of a deque."""
+        batch = []
+        try:
+            for _ in range(limit):
+                batch.append(items.popleft())
+        except IndexError:
+            pass
+        return batch
+    
+    def flush(self):
+        """Write everything queued so far to the database, one transaction per drain."""
+        while self._tx_queue or self._fraud_queue:
+            # Take all rows queued so far: a backlog costs one executemany and one commit, not one per BATCH_SIZE
+            transactions = self._pop_batch(self._tx_queue, len(self._tx_queue))
+            fraud_results = self._pop_batch(self._fraud_queue, len(self._fraud_queue))
+            
+            # The status rarely changes, so only refresh a node's last_seen every STATUS_INTERVAL seconds
+            now = time.monotonic()
+            node_ids = {row[0] for row in transactions} | {result[0] for result in fraud_results}
+            online_nodes = [node_id for node_id in node_ids
+                            if now - self._last_status_write.get(node_id, float('-inf')) >= self.STATUS_INTERVAL]
+            try:
+                self.db.add_batch(transactions, fraud_results, online_nodes)
+                self._last_status_write.update(dict.fromkeys(online_nodes, now))
+                # Per-message and per-flush lines use %-style args, formatted only if the record is emitted
+                logger.info("Stored %d transactions and %d fraud results", len(transactions), len(fraud_results))
+            except Exception as e:
+                logger.error(f"Error storing batch ({len(transactions)} transactions, "
+                             f"{len(fraud_results)} fraud results): {e}, retrying row by row")
+                self._store_rows_individually(transactions, fraud_results, online_nodes, now)
+        
+        drops = (self.dropped_transactions, self.dropped_fraud_results)
+        if drops != self._reported_drops:
+            self._reported_drops = drops
+            logger.warning("Queue full, dropped %d transactions and %d fraud results so far", *drops)
+    
+    def _store_rows_individually(self, transactions: list, fraud_results: list, online_nodes: list, now: float):
+        """Store a batch that failed as a whole one row per transaction, so only the malformed rows are lost."""
+        stored_transactions = stored_fraud_results = 0
+        for row in transactions:
+            try:
+                self.db.add_batch([row], [], ())
+                stored_transactions += 1
+            except Exception as e:
+                logger.warning("Dropped transaction row from node %s: %s", row[0], e)
+        for result in fraud_results:
+            try:
+                self.db.add_batch([], [result], ())
+                stored_fraud_results += 1
+            except Exception as e:
+                logger.warning("Dropped fraud result from node %s: %s", result[0], e)
+        try:
+            self.db.add_batch([], [], online_nodes)
+            self._last_status_write.update(dict.fromkeys(online_nodes, now))
+        except Exception as e:
+            logger.error(f"Error updating node status: {e}")
+        logger.info("Stored %d of %d transactions and %d of %d fraud results row by row",
+                    stored_transactions, len(transactions), stored_fraud_results, len(fraud_results))
+    
+    def _flusher_loop(self):
+        """Flush the queues every FLUSH_INTERVAL seconds, or sooner once a batch is full."""
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.FLUSH_INTERVAL)
+            self._flush_event.clear()
+            self.flush()
+    
     def connect(self):
         """Connect to MQTT broker and start listening."""
         try:
@@ -196,19 +365,34 @@ class MQTTSubscriber:
                 mqtt_config.get('keepalive', 60)
             )
             
-            # Start the loop
+            # Start writing queued messages to the database
+            self._flusher.start()
+            
+            # Start the loop: paho reads the socket on its own thread while the flusher
+            # thread writes to the database, so neither waits on the other
             logger.info("Starting MQTT client loop...")
-            self.client.loop_forever()
+            self.client.loop_start()
+            
+            # Keep the main thread idle (and interruptible with Ctrl+C) until disconnect()
+            while not self._stop_event.wait(0.5):
+                pass
             
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
             raise
     
     def disconnect(self):
-        """Disconnect from MQTT broker."""
+        """Disconnect from MQTT broker and store the messages still queued."""
         if self.client:
             self.client.disconnect()
+            self.client.loop_stop()
             logger.info("Disconnected from MQTT broker")
+        
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._flusher.is_alive():
+            self._flusher.join()
+        self.flush()
 
 
 def main():